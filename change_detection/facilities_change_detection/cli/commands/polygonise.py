@@ -6,8 +6,8 @@ import typer
 
 from facilities_change_detection.core.log import get_logger
 from facilities_change_detection.core.polygonise import (
-    build_titles_with_owners,
     find_points_in_titles_with_owners,
+    load_titles_with_owners,
 )
 
 logger = get_logger()
@@ -79,12 +79,25 @@ def polygonise(
             ),
         ),
     ] = None,
+    cache_dir: typing.Annotated[
+        Path,
+        typer.Option(
+            dir_okay=True,
+            file_okay=False,
+            resolve_path=True,
+            help=(
+                "Optional directory to cache the combined titles with owners in, and reuse them from on later runs "
+                "if the input files haven't changed since. Titles with owners will only be cached if a path to a "
+                "directory is passed via this parameter."
+            ),
+        ),
+    ] = None,
 ):
     logger.info(f"Reading input from {input_file}")
     input_gdf = gpd.read_file(input_file, layer=input_layer, engine="pyogrio", use_arrow=True)
     input_gdf = input_gdf.to_crs(2193)
     input_gdf.sindex
-    titles_gdf = build_titles_with_owners(titles_file, owners_file, use_standardised_names)
+    titles_gdf = load_titles_with_owners(titles_file, owners_file, use_standardised_names, cache_dir)
     if save_titles_file is not None:
         logger.info(f"Saving combined titles with owners layer to {save_titles_file}")
         titles_gdf.to_file(save_titles_file, engine="pyogrio")
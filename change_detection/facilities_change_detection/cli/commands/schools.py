@@ -27,6 +27,9 @@ def compare_schools(
             ),
         ),
     ] = None,
+    input_layer: typing.Annotated[
+        str | None, typer.Option(help="Layer name in the input file if it contains multiple layers.")
+    ] = None,
     input_db: typing.Annotated[
         DBConnectionDetails | None,
         typer.Option(
@@ -80,7 +83,7 @@ def compare_schools(
         raise typer.BadParameter("Only one of --input-file or --input-db may be passed.")
     elif input_file is not None:
         logger.info("Loading facilities from file")
-        facilities_schools = load_file_source(input_file)
+        facilities_schools = load_file_source(input_file, layer=input_layer)
     elif input_db is not None:
         logger.info("Loading facilities from DB")
         facilities_schools = load_db_source(input_db)
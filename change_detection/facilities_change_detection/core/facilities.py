@@ -1,14 +1,24 @@
 import datetime
+import math
 import typing
 from dataclasses import dataclass
 from enum import StrEnum
 
+import shapely
 from shapely import Polygon
 from shapely.geometry.base import BaseGeometry
 
 COMPARABLE = "COMPARABLE"
 DEFAULT_COMPARABLE = "DEFAULT_COMPARABLE"
 DISTANCE_THRESHOLD = 350
+# Assignments to add to the SET clause of the generated UPDATE SQL for each
+# changed attribute, formatted with the new value of the attribute quoted as
+# an SQL string literal
+UPDATE_SQL_ATTR_ASSIGNMENTS = {
+    "source_name": "name={new},  source_name={new}, ",
+    "source_type": "use_type={new}, ",
+    "occupancy": "estimated_occupancy={new}, ",
+}
 
 
 class ChangeAction(StrEnum):
@@ -56,7 +66,7 @@ class Comparison(typing.NamedTuple):
         return {k: (a, b) for k, (a, b) in self.attrs.items() if a != b}
 
 
-@dataclass
+@dataclass(slots=True)
 class Source:
     """
     Base class for data sources
@@ -96,12 +106,15 @@ class Source:
 
 
 class ExternalSource(Source):
+    # Declare no slots of its own, so subclasses don't gain a __dict__
+    __slots__ = ()
+
     @classmethod
     def from_external(cls, record) -> typing.Self:
         raise NotImplementedError
 
 
-@dataclass(eq=False)
+@dataclass(eq=False, slots=True)
 class Facility(Source):
     schema: typing.ClassVar[GeoSchema] = {
         "geometry": "MultiPolygon",
@@ -176,9 +189,15 @@ class Facility(Source):
             },
         }
 
-    def update_from_other(self, other: ExternalSource, check_attrs: set[str] = Source.default_comparable_attrs):
-        # Compare geometry
-        distance = self.geom.distance(other.geom) if other.geom is not None else None
+    def update_from_other(
+        self,
+        other: ExternalSource,
+        check_attrs: set[str] = Source.default_comparable_attrs,
+        distance: float | None = None,
+    ):
+        # Compare geometry, unless the distance has already been calculated
+        if distance is None and other.geom is not None:
+            distance = self.geom.distance(other.geom)
         if distance is None:
             self.change_action = ChangeAction.UPDATE_GEOM
             self.change_description = "Geom: missing"
@@ -214,18 +233,34 @@ class Facility(Source):
         Generates an SQL UPDATE query to update the NZ Facilities database
         with the changes described in the passed comparison object.
         """
-        sql = "UPDATE facilities.facilities SET "
-        for attr, (old, new) in changed_attrs.items():
-            match attr:
-                case "source_name":
-                    sql += f"name='{new}',  source_name='{new}', "
-                case "source_type":
-                    sql += f"use_type='{new}', "
-                case "occupancy":
-                    sql += f"estimated_occupancy='{new}', "
-        sql += "last_modified=CURRENT_DATE "
-        sql += f"WHERE facility_id={self.facilities_id} AND source_facility_id={self.source_id};"
-        return sql
+        return "".join(
+            [
+                "UPDATE facilities.facilities SET ",
+                *(
+                    UPDATE_SQL_ATTR_ASSIGNMENTS[attr].format(new=quote_sql_literal(new))
+                    for attr, (old, new) in changed_attrs.items()
+                    if attr in UPDATE_SQL_ATTR_ASSIGNMENTS
+                ),
+                "last_modified=CURRENT_DATE ",
+                f"WHERE facility_id={self.facilities_id} AND source_facility_id={quote_sql_literal(self.source_id)};",
+            ]
+        )
+
+
+def quote_sql_literal(value: typing.Any) -> str:
+    """
+    Quotes a value as an SQL string literal, for use in generated SQL.
+
+    Any single quotes in the value, such as the apostrophes in many school
+    names, are escaped by doubling them.
+
+    Args:
+        value: The value to quote. Non-string values are converted to strings.
+
+    Returns:
+        The value as an SQL string literal.
+    """
+    return "'" + str(value).replace("'", "''") + "'"
 
 
 def compare_facilities(
@@ -239,14 +274,35 @@ def compare_facilities(
     in the MOE dataset). MOE schools which are not in the facilities are marked
     to be added.
     """
-    for facility_id, facility in facilities.items():
-        external_match = external_sources.get(facility_id)
-        if external_match and external_match.change_action != ChangeAction.IGNORE:
-            facility.update_from_other(external_match, check_attrs=comparison_attrs)
+    facility_ids = facilities.keys()
+    external_source_ids = external_sources.keys()
+    # Facilities which are not in the external sources, or only match an
+    # ignored external source, are removed
+    removed_ids = facility_ids - external_source_ids
+    matched_ids = []
+    for facility_id in facility_ids & external_source_ids:
+        if external_sources[facility_id].change_action != ChangeAction.IGNORE:
+            matched_ids.append(facility_id)
         else:
-            facility.change_action = ChangeAction.REMOVE
-            facility.geometry_change = "Delete"
-    for external_source_id, external_source in external_sources.items():
-        if external_source.change_action != ChangeAction.IGNORE and external_source_id not in facilities:
+            removed_ids.add(facility_id)
+    # Calculate the distances between all the matched pairs in a single call.
+    # Pairs with a missing geometry have a distance of NaN.
+    distances = shapely.distance(
+        [facilities[facility_id].geom for facility_id in matched_ids],
+        [external_sources[facility_id].geom for facility_id in matched_ids],
+    )
+    for facility_id, distance in zip(matched_ids, distances.tolist()):
+        facilities[facility_id].update_from_other(
+            external_sources[facility_id],
+            check_attrs=comparison_attrs,
+            distance=None if math.isnan(distance) else distance,
+        )
+    for facility_id in removed_ids:
+        facilities[facility_id].change_action = ChangeAction.REMOVE
+        facilities[facility_id].geometry_change = "Delete"
+    # External sources which are not in the facilities are added
+    for external_source_id in external_source_ids - facility_ids:
+        external_source = external_sources[external_source_id]
+        if external_source.change_action != ChangeAction.IGNORE:
             external_source.change_action = ChangeAction.ADD
     return facilities, external_sources
@@ -7,11 +7,13 @@ import chompjs
 import geopandas as gpd
 import lxml.html
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
 import requests
 from python_calamine import CalamineWorkbook
 from tqdm import tqdm
 
-from facilities_change_detection.core.facilities import DISTANCE_THRESHOLD, ChangeAction
+from facilities_change_detection.core.facilities import DISTANCE_THRESHOLD, ChangeAction, quote_sql_literal
 from facilities_change_detection.core.io import download_file
 from facilities_change_detection.core.log import get_logger
 from facilities_change_detection.core.util import (
@@ -30,6 +32,8 @@ HPI_EXCEL_PAGE_URL = (
     "for-health-professionals/data-and-statistics/nz-health-statistics/"
     "data-references/code-tables/common-code-tables/"
 )
+# Pattern to parse the date last updated from the filename of an HPI Excel file
+HPI_FILENAME_PATTERN = re.compile(r"Facilities(\d{4})(\d{2})(\d{2})")
 # Columns to read from an HPI Excel file. The keys are the column names
 # following standardisation using util.standardise_column_name, and the values
 # are what the column will be renamed to.
@@ -47,6 +51,24 @@ HPI_COLUMNS_OF_INTEREST = {
 # Keys are column names in NZ Facilities, with values of column names to compare
 # against in the HPI data.
 FACILITIES_HPI_COMPARISON_COLUMNS = {"name": "name", "source_name": "name", "use_type": "type", "estimated_occupancy": "occupancy"}
+# Replacement operations applied in order to the "type" column of the HPI data
+# by `standardise_hpi_type`, as tuples of (pattern, replacement, regex).
+HPI_TYPE_REPLACEMENTS = [
+    # Add space before and after forward slashes
+    (re.compile(r"(?<=\S)\/"), " /", True),
+    (re.compile(r"\/(?=\S)"), "/ ", True),
+    # Replace en dash with hyphenminus. This would be better to use the
+    # unicode character class \p{Dash_Punctuation}, but pandas uses the
+    # builtin Python regex engine with doesn't support this, and given there
+    # only seems to be an en dash in some older HPI Excel files, it seems
+    # better just to search for that and still use pandas than have to drop
+    # down to using the regex 3rd party library which doesn support unicode
+    # character classes.
+    ("–", "-", False),
+    # All the others seem to be in the form of "thing - suffix", apart from
+    # this one in the form "thing (suffix)"
+    (re.compile(r" \(not otherwise specified\)$"), " - not otherwise specified", True),
+]
 # URLs of pages with maps of HealthCERT featuress to scrape
 HEALTHCERT_MAP_URLS = {
     "Public hospital": "https://www.health.govt.nz/your-health/certified-providers/public-hospital",
@@ -89,7 +111,6 @@ def download_hpi_excel(output_folder: Path, overwrite: bool) -> Path:
         The path where the file was saved.
     """
     # Download the landing page and raise exception for any errors
-    print(logger.getEffectiveLevel())
     logger.info("Downloading HTML of landing page")
     r = requests.get(HPI_EXCEL_PAGE_URL)
     r.raise_for_status()
@@ -107,7 +128,7 @@ def download_hpi_excel(output_folder: Path, overwrite: bool) -> Path:
     download_url = urljoin(HPI_EXCEL_PAGE_URL, href)
     # Extract date from filename and build standardised output filename
     download_filename = href.split("/")[-1]
-    if name_match := re.match(r"Facilities(\d{4})(\d{2})(\d{2})", download_filename):
+    if name_match := HPI_FILENAME_PATTERN.match(download_filename):
         year, month, day = name_match.groups()
         output_file = output_folder / f"hpi__{year}-{month}-{day}.xlsx"
     else:
@@ -140,7 +161,9 @@ def download_healthcert_gpkg(show_progressbar: bool) -> gpd.GeoDataFrame:
         A GeoDataFrame containing all features from the map.
     """
     gdfs = [scrape_healthcert_map_page(kind, show_progressbar) for kind in HEALTHCERT_MAP_URLS.keys()]
-    return gpd.GeoDataFrame(pd.concat(gdfs, ignore_index=True))
+    # Concatenating GeoDataFrames returns a GeoDataFrame with the same CRS,
+    # so there's no need to copy the result into a new one
+    return pd.concat(gdfs, ignore_index=True)
 
 
 def scrape_healthcert_map_page(kind, show_progressbar: bool) -> gpd.GeoDataFrame:
@@ -286,10 +309,12 @@ def load_hpi_excel(input_file: Path, ignore_file: Path | None = None) -> gpd.Geo
     # comparing that old data to new data
     hpi_df["address"] = hpi_df["address"].str.rstrip(",")
     hpi_df["type"] = standardise_hpi_type(hpi_df["type"])
-    # Convert the Pandas DataFrame to a Geopandas GeoDataFrame
-    hpi_gdf = gpd.GeoDataFrame(data=hpi_df, geometry=gpd.points_from_xy(hpi_df.x, hpi_df.y), crs=4167)
+    # Convert the Pandas DataFrame to a Geopandas GeoDataFrame, popping the
+    # coordinate columns first so they aren't copied into the new frame
+    x = hpi_df.pop("x").to_numpy()
+    y = hpi_df.pop("y").to_numpy()
+    hpi_gdf = gpd.GeoDataFrame(data=hpi_df, geometry=gpd.points_from_xy(x, y), crs=4167)
     hpi_gdf = hpi_gdf.to_crs(2193)
-    hpi_gdf.drop(columns=["x", "y"], inplace=True)
     hpi_gdf = convert_intlike_cols_to_nullable_int(hpi_gdf)
     return hpi_gdf
 
@@ -339,7 +364,8 @@ def load_healthcert_hospitals(input_file: Path) -> gpd.GeoDataFrame:
 def standardise_hpi_type(col: pd.Series) -> pd.Series:
     """
     Standardises values in the "type" column of the HPI data by performing
-    a series of replacement operations on the column.
+    the series of replacement operations defined in `HPI_TYPE_REPLACEMENTS`
+    on the column.
 
     Args:
         col: The "type" column from an HPI DataFrame.
@@ -347,32 +373,16 @@ def standardise_hpi_type(col: pd.Series) -> pd.Series:
     Returns:
         The supplied "type" column with values standardised.
     """
-    ops = [
-        # Add space before and after forward slashes
-        (r"(?<=\S)\/", " /", True),
-        (r"\/(?=\S)", "/ ", True),
-        # Replace en dash with hyphenminus. This would be better to use the
-        # unicode character class \p{Dash_Punctuation}, but pandas uses the
-        # builtin Python regex engine with doesn't support this, and given there
-        # only seems to be an en dash in some older HPI Excel files, it seems
-        # better just to search for that and still use pandas than have to drop
-        # down to using the regex 3rd party library which doesn support unicode
-        # character classes.
-        ("–", "-", False),
-        # All the others seem to be in the form of "thing - suffix", apart from
-        # this one in the form "thing (suffix)"
-        (r" \(not otherwise specified\)$", " - not otherwise specified", True),
-    ]
-    for pattern, replacement, regex in ops:
+    for pattern, replacement, regex in HPI_TYPE_REPLACEMENTS:
         col = col.str.replace(pattern, replacement, regex=regex)
     return col
 
 
-def load_hpi_ignore_file(ignore_file: Path) -> set[str]:
+def load_hpi_ignore_file(ignore_file: Path) -> frozenset[str]:
     """
     Loads a CSV of HPI ids to ignore. The CSV must have a column named
     "hpi_facility_id". Other columns can be present but are ignore by
-    this function.
+    this function, and are skipped by the CSV reader rather than parsed.
 
     Args:
         ignore_file: Path to the CSV file to read.
@@ -380,8 +390,13 @@ def load_hpi_ignore_file(ignore_file: Path) -> set[str]:
     Returns:
         Set of the ids to ignore.
     """
-    df = pd.read_csv(ignore_file, usecols=["hpi_facility_id"])
-    return set(df["hpi_facility_id"])
+    table = pacsv.read_csv(
+        ignore_file,
+        convert_options=pacsv.ConvertOptions(
+            include_columns=["hpi_facility_id"], column_types={"hpi_facility_id": pa.string()}
+        ),
+    )
+    return frozenset(table.column("hpi_facility_id").to_pylist())
 
 
 def load_linking_file(linking_file: Path) -> pd.DataFrame:
@@ -621,15 +636,15 @@ def compare_facilities_to_hpi(
                 for attr, (old_attr, new_attr) in attr_changes.items():
                     match attr:
                         case "name":
-                            sql += f"name='{new_attr}', "
+                            sql += f"name={quote_sql_literal(new_attr)}, "
                         case "source_name":
-                            sql += f"source_name='{new_attr}', "
+                            sql += f"source_name={quote_sql_literal(new_attr)}, "
                         case "use_type":
-                            sql += f"use_type='{new_attr}', "
+                            sql += f"use_type={quote_sql_literal(new_attr)}, "
                         case "estimated_occupancy":
-                            sql += f"estimated_occupancy='{new_attr}', "
+                            sql += f"estimated_occupancy={quote_sql_literal(new_attr)}, "
                 sql += "last_modified=CURRENT_DATE "
-                sql += f"WHERE facility_id={facility_id} AND source_facility_id='{hpi_facility_id}';"
+                sql += f"WHERE facility_id={facility_id} AND source_facility_id={quote_sql_literal(hpi_facility_id)};"
 
                 if facilities_attrs["change_action"] == ChangeAction.UPDATE_GEOM:
                     facilities_attrs["change_action"] = ChangeAction.UPDATE_GEOM_ATTR
@@ -654,9 +669,7 @@ def compare_facilities_to_hpi(
     hpi_matched_gdf = gpd.GeoDataFrame(dict_to_df(matched_facilities, "hpi_facility_id"), geometry="geometry", crs=2193)
     # Add back in facilities rows with missing value for source_facility_id
     if not facilities_missing_id_gdf.empty:
-        updated_facilities_gdf = gpd.GeoDataFrame(
-            pd.concat([updated_facilities_gdf, facilities_missing_id_gdf], ignore_index=True)
-        )
+        updated_facilities_gdf = pd.concat([updated_facilities_gdf, facilities_missing_id_gdf], ignore_index=True)
     return updated_facilities_gdf, hpi_new_gdf, hpi_matched_gdf
 
 
@@ -1,13 +1,14 @@
-import json
+import shutil
 import sqlite3
 import typing
 from pathlib import Path
 
 import fiona
-import psycopg2
+import psycopg
 import requests
+import shapely
 from fiona.crs import CRS
-from psycopg2 import OperationalError, extras
+from psycopg import OperationalError, sql
 from shapely.geometry import shape
 from tqdm import tqdm
 
@@ -17,6 +18,9 @@ from facilities_change_detection.core.schools import FatalError
 
 logger = get_logger()
 
+# Number of rows to fetch from the database server at a time
+DB_FETCH_BATCH_SIZE = 10000
+
 FACILITIES_SQL = """
 SELECT
     facility_id,
@@ -28,7 +32,7 @@ SELECT
     use_subtype,
     estimated_occupancy,
     last_modified,
-    ST_AsGeoJSON(shape) as shape
+    ST_AsBinary(shape) as shape
 FROM
     {schema}.{table}
 WHERE use = 'School'
@@ -65,8 +69,13 @@ INSERT OR REPLACE INTO layer_styles (
     description,
     owner
 )
-VALUES ('', '', (?), 'geom', 'Style', (?), '', true, '', '');
+VALUES {values};
 """
+# Row of placeholders for LAYER_STYLES_INSERT_SQL, repeated once per layer style
+LAYER_STYLES_INSERT_VALUES = "('', '', (?), 'geom', 'Style', (?), '', true, '', '')"
+# Number of layer styles to insert in each INSERT statement, to stay within
+# the limit of 999 variables in a single statement in SQLite before 3.32
+LAYER_STYLES_INSERT_BATCH_SIZE = 999 // LAYER_STYLES_INSERT_VALUES.count("?")
 
 GPKG_CONTENTS_INSERT_SQL = """
 INSERT OR REPLACE INTO gpkg_contents (table_name, data_type, identifier, description, srs_id)
@@ -89,38 +98,61 @@ def save_layers_to_gpkg(
         layer_data: the data the layer will contain
         layer_name: the name of the layer
     """
+    # Disable SQLite syncing and use an in-memory journal and larger SQLite
+    # and GDAL caches while writing, as the file is written in one go and can
+    # be recreated if the write fails. The GPKG driver already defers building
+    # the spatial index of a new layer until the layer is closed.
     # noinspection PyTypeChecker,PyArgumentList
-    with fiona.open(
-        output_file,
-        "w",
-        driver="GPKG",
-        layer=layer_name,
-        schema=layer_schema,
-        crs=CRS.from_epsg(2193),
-    ) as output:
+    with (
+        fiona.Env(
+            GDAL_CACHEMAX=512, OGR_SQLITE_SYNCHRONOUS="OFF", OGR_SQLITE_JOURNAL="MEMORY", OGR_SQLITE_CACHE=512
+        ),
+        fiona.open(
+            output_file,
+            "w",
+            driver="GPKG",
+            layer=layer_name,
+            schema=layer_schema,
+            crs=CRS.from_epsg(2193),
+        ) as output,
+    ):
         logger.info(f"Writing layer {layer_name} to {output_file.name}")
         output.writerecords(layer_data)
 
 
-def load_file_source(file: Path) -> dict[int, Facility]:
+def load_file_source(file: Path, layer: str | None = None) -> dict[int, Facility]:
     """
     Loads the facilities from file.
+
+    Args:
+        file: path to an OGR readable file containing the facilities.
+        layer: name of the layer to read, if the file contains multiple
+            layers. Defaults to None, which reads the first layer.
+
+    Returns:
+        Facilities with a use of School, keyed by their source ID.
     """
-    facilities_schools = {}
     try:
-        with fiona.open(file) as src:
-            for feature in tqdm(src, total=len(src), unit="facilities"):
-                if feature["properties"]["use"] == "School":
-                    facilities_school = Facility.from_props_and_geom(
-                        properties=feature["properties"], geom=shape(feature["geometry"])
-                    )
-                    facilities_schools[facilities_school.source_id] = facilities_school
-        return facilities_schools
+        # Filter to schools using an OGR SQL attribute filter, so other
+        # features are skipped by the driver rather than read into Python
+        with fiona.open(file, layer=layer) as src:
+            features = tqdm(src.filter(where="use = 'School'"), unit="facilities")
+            return {
+                facilities_school.source_id: facilities_school
+                for facilities_school in map(facility_from_feature, features)
+            }
     except Exception as error:
         error_name = get_error_name(error)
         raise FatalError(f"Unable to load file {file}: {error_name} {error}") from error
 
 
+def facility_from_feature(feature: fiona.Feature) -> Facility:
+    """
+    Builds a Facility from a feature read from file by Fiona.
+    """
+    return Facility.from_props_and_geom(properties=feature["properties"], geom=shape(feature["geometry"]))
+
+
 def load_db_source(dbconn_json: dict[str, str]) -> dict[int, Facility]:
     """
     Connects to the database the user desires and queries specific
@@ -128,28 +160,74 @@ def load_db_source(dbconn_json: dict[str, str]) -> dict[int, Facility]:
     """
     facilities_schools = {}
     try:
-        db_conn = psycopg2.connect(
+        db_conn = psycopg.connect(
             host=dbconn_json["host"],
             port=dbconn_json["port"],
-            database=dbconn_json["name"],
+            dbname=dbconn_json["name"],
             user=dbconn_json["user"],
             password=dbconn_json["password"],
+            prepare_threshold=1,
+        )
+        # Quote the schema and table names as identifiers rather than
+        # interpolating them into the query text as-is
+        query = sql.SQL(FACILITIES_SQL).format(
+            schema=sql.Identifier(dbconn_json["schema"]), table=sql.Identifier(dbconn_json["table"])
         )
-        query = FACILITIES_SQL.format(schema=dbconn_json["schema"], table=dbconn_json["table"])
-        cursor = db_conn.cursor(cursor_factory=extras.DictCursor)
-        cursor.execute(query)
-        features = cursor.fetchall()
-        for feature in tqdm(features, total=len(features), unit="facilities"):
-            geom = json.loads(feature.pop("shape"))
-            del geom["crs"]
-            facilities_school = Facility.from_props_and_geom(properties=feature, geom=geom)
-            facilities_schools[facilities_school.source_id] = facilities_school
-        db_conn.close()
+        # Use a named (server-side) cursor so rows are streamed from the server
+        # in batches, rather than all fetched into memory at once. Rows are
+        # transferred using the binary protocol to reduce decoding cost, and
+        # returned as tuples in the column order of FACILITIES_SQL.
+        with (
+            db_conn,
+            db_conn.cursor(name="facilities_stream", binary=True) as cursor,
+            tqdm(unit="facilities") as progress,
+        ):
+            cursor.execute(query)
+            while rows := cursor.fetchmany(DB_FETCH_BATCH_SIZE):
+                facilities_schools.update(
+                    (facilities_school.source_id, facilities_school)
+                    for facilities_school in facilities_from_rows(rows)
+                )
+                progress.update(len(rows))
     except OperationalError as error:
         print(f"The error '{error}' occurred")
     return facilities_schools
 
 
+def facilities_from_rows(rows: list[tuple]) -> list[Facility]:
+    """
+    Builds Facilities from a batch of rows returned by FACILITIES_SQL. The
+    geometries of the whole batch are parsed from WKB in a single call.
+    """
+    geoms = shapely.from_wkb([bytes(row[-1]) for row in rows])
+    return [
+        Facility(
+            source_id=source_facility_id,
+            source_name=source_name,
+            source_type=use_type,
+            facilities_id=facility_id,
+            facilities_name=name,
+            occupancy=estimated_occupancy,
+            facilities_use=use,
+            facilities_subtype=use_subtype,
+            last_modified=last_modified,
+            geom=geom,
+        )
+        for (
+            facility_id,
+            source_facility_id,
+            name,
+            source_name,
+            use,
+            use_type,
+            use_subtype,
+            estimated_occupancy,
+            last_modified,
+            _,
+        ), geom in zip(rows, geoms)
+    ]
+
+
 def get_error_name(error: BaseException) -> str:
     """
     Returns the name of the supplied exception, optionally prefixed
@@ -161,14 +239,14 @@ def get_error_name(error: BaseException) -> str:
         return error.__class__.__name__
 
 
-def download_file(url: str, output_file: Path, chunk_size=1024) -> Path:
+def download_file(url: str, output_file: Path, chunk_size=1024 * 1024) -> Path:
     """
     Downloads a file from a supplied URL to a supplied output path.
 
     Args:
         url: The URL of the file to download.
         output_file: The path to save the file to.
-        chunk_size: size in bytes of chunks to download at a time. Defaults to 1024.
+        chunk_size: size in bytes of chunks to download at a time. Defaults to 1 MiB.
 
     Raises:
         requests.RequestException [or child Exceptions]: if any network issues
@@ -180,8 +258,10 @@ def download_file(url: str, output_file: Path, chunk_size=1024) -> Path:
     with requests.get(url, stream=True) as r:
         r.raise_for_status()
         with open(output_file, "wb") as f:
-            for chunk in r.iter_content(chunk_size):
-                f.write(chunk)
+            # Have urllib3 undo any content encoding (e.g. gzip), as
+            # iter_content would, then copy straight from the socket to file
+            r.raw.decode_content = True
+            shutil.copyfileobj(r.raw, f, length=chunk_size)
     return output_file
 
 
@@ -195,19 +275,34 @@ def add_styles_to_gpkg(gpkg_file: Path, layer_styles: dict[str, str]) -> None:
             QGIS QML layer style definition.
     """
     connection = sqlite3.connect(gpkg_file)
-    cursor = connection.cursor()
-    cursor.execute("BEGIN TRANSACTION")
     try:
-        cursor.execute(LAYER_STYLES_CREATE_SQL)
-        cursor.executemany(
-            LAYER_STYLES_INSERT_SQL,
-            [(layer_name, layer_style) for layer_name, layer_style in layer_styles.items()],
-        )
-        cursor.execute(GPKG_CONTENTS_INSERT_SQL, ("layer_styles", "attributes", "layer_styles", "", 0))
-        cursor.execute("COMMIT;")
+        cursor = connection.cursor()
+        # Skip syncing to disk and keep the journal and temporary tables in
+        # memory, as these inserts all happen in a single transaction
+        cursor.execute("PRAGMA synchronous=OFF")
+        cursor.execute("PRAGMA journal_mode=MEMORY")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        # Using the connection as a context manager commits the transaction
+        # if all statements succeed, or rolls it back if any raise. sqlite3
+        # doesn't implicitly begin a transaction before DDL statements, so
+        # begin it explicitly to include creating the table.
+        with connection:
+            cursor.execute("BEGIN")
+            cursor.execute(LAYER_STYLES_CREATE_SQL)
+            # Insert the styles with one multi-row INSERT per batch, rather
+            # than running the statement separately for each style
+            layer_style_items = list(layer_styles.items())
+            for start in range(0, len(layer_style_items), LAYER_STYLES_INSERT_BATCH_SIZE):
+                batch = layer_style_items[start : start + LAYER_STYLES_INSERT_BATCH_SIZE]
+                cursor.execute(
+                    LAYER_STYLES_INSERT_SQL.format(values=", ".join([LAYER_STYLES_INSERT_VALUES] * len(batch))),
+                    [value for layer_style in batch for value in layer_style],
+                )
+            cursor.execute(GPKG_CONTENTS_INSERT_SQL, ("layer_styles", "attributes", "layer_styles", "", 0))
     except Exception:
-        logger.error("Error adding layer styles to GeoPackage, rolling back.")
-        cursor.execute("ROLLBACK;")
+        logger.exception("Error adding layer styles to GeoPackage, rolled back.")
+    finally:
+        connection.close()
 
 
 def get_layer_style_content(file_name: str) -> str:
@@ -1,10 +1,12 @@
+import functools
 import logging
 
 LOGGER_NAME = "facilities_change_detection"
 
 
+@functools.cache
 def get_logger() -> logging.Logger:
-    return logging.getLogger("facilities_change_detection")
+    return logging.getLogger(LOGGER_NAME)
 
 
 def setup_logging() -> None:
@@ -1,16 +1,78 @@
+import json
+import os
+import re
+import typing
 from pathlib import Path
 
 import geopandas as gpd
 import numpy as np
 import pandas as pd
 import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
 import shapely
-from pandarallel import pandarallel
+from tqdm import tqdm
 
 from facilities_change_detection.core.log import get_logger
 
 TITLES_GDF = None
+# Arrays of the ids and geometries of the titles in TITLES_GDF, and a spatial
+# index of the geometries, whose query results are positions in these arrays
+TITLE_IDS = None
+TITLE_GEOMS = None
+TITLES_TREE = None
+# Simplified title geometries, and a spatial index of them, used to find
+# nearby titles when growing polygons
+TITLE_SIMPLIFIED_GEOMS = None
+TITLES_SIMPLIFIED_TREE = None
+# Integer code of the owner of each title in TITLES_GDF, or -1 if it has none
+TITLE_OWNER_CODES = None
+# Owner names, indexed by owner code
+OWNER_NAMES = None
+# Mapping of each owner code to the positions of their titles in TITLES_GDF
+TITLE_POSITIONS_BY_OWNER = None
+# Cache of the positions of the titles within the distance threshold of each
+# title in TITLES_GDF, keyed by title position
+TITLE_NEIGHBOURS = None
 TITLE_MERGE_MAX_ROUNDS = 20
+# Version of the titles with owners cache format, included in the cache file
+# name so caches written by an older version of this module are not reused
+TITLES_CACHE_VERSION = 3
+# Key of the titles with owners cache details in the cache file's metadata
+TITLES_CACHE_METADATA_KEY = b"facilities_change_detection:titles_cache"
+# Tolerance in metres for simplifying titles when finding nearby titles. The
+# exact geometries are still used to find the titles a point is within, and
+# to create the output polygons.
+TITLE_SIMPLIFY_TOLERANCE = 0.5
+# Characters to delete from corporate names: quotes, comma, plus, hash, dots
+# and brackets. Also replaces en dash with hyphen-minus.
+CORPORATE_NAME_TRANSLATION = str.maketrans({"–": "-", **dict.fromkeys("',+#\".()[]")})
+# Words in corporate names to replace: spells limited, incorporated and
+# company in full, and abbreviates road, street and avenue
+CORPORATE_NAME_ABBREVIATIONS = {
+    "ltd": "limited",
+    "inc": "incorporated",
+    "co": "company",
+    "road": "rd",
+    "street": "st",
+    "avenue": "ave",
+}
+CORPORATE_NAME_PATTERN = re.compile(
+    "|".join(
+        [
+            # Replace runs of spaces, ampersands and hyphens with a single
+            # space, or with `and` if the run contains an ampersand
+            r"[ &\-]+",
+            # Replace the words in CORPORATE_NAME_ABBREVIATIONS, when they
+            # follow a separator and are at the end of the name or followed
+            # by a separator
+            rf"(?<=[ &\-])(?P<abbreviation>{'|'.join(CORPORATE_NAME_ABBREVIATIONS)})(?=[ &\-]|$)",
+            # Insert a space between letters and digits: `abc123` and `no1`
+            # become `abc 123` and `no 1`, and `123abc` becomes `123 abc`
+            r"(?<=[a-z])(?=\d)|(?<=\d)(?=[a-z])",
+        ]
+    )
+)
 
 
 logger = get_logger()
@@ -28,52 +90,37 @@ def standardise_corporate_name(s: pd.Series) -> pd.Series:
     Returns:
         The input series with values standardised.
     """
-    # Normalise unicode characters
-    s = s.str.normalize("NFD")
-    # Encode to ASCII and ignore errors:
-    # converts non-ASCII characters to closest ASCII equivilant
-    s = s.str.encode("ascii", errors="ignore")
-    # Convert back to string type
-    s = s.astype("string[pyarrow]")
-    # Lowercase
-    s = s.str.lower()
-    for pattern, replacement, regex in [
-        # Replace Quotes, comma, hash, dots, and brackets with a space
-        (r"[',+#\"\.\(\)\[\]]", "", True),
-        # Replace more than one space with a single space
-        (r" +", " ", True),
-        # Replace ampersand with and
-        (r" ?& ?", " and ", True),
-        # Replace en dash with hyphenminus
-        ("–", "-", False),
-        # Replace hyphen with optional leading or trailing space with
-        # single space
-        (r" ?- ?", " ", True),
-        # Replace `no1` with `no 1`
-        (r"no ?(\d)", r"no \1", True),
-        # Spell limited in full
-        (r" ltd(?:$| )", " limited ", True),
-        # Spell incorporated in full
-        (r" inc(?:$| )", " incorporated ", True),
-        # Spell company in full
-        (r" co(?:$| )", " company ", True),
-        # Spell road abbreviated
-        (r" road(?:$| )", " rd ", True),
-        # Spell street abbreviated
-        (r" street(?:$| )", " st ", True),
-        # Spell avenue abbreviated
-        (r" avenue(?:$| )", " ave ", True),
-        # Replace `abc123` with `abc123`
-        (r"([a-z])(\d)", r"\1 \2", True),
-        # Replace `123abc` with `123 abc`
-        (r"(\d)([a-z])", r"\1 \2", True),
-    ]:
-        s = s.str.replace(pattern, replacement, regex=regex)
+    # Convert to lowercase ASCII
+    s = to_lowercase_ascii(s)
+    # Apply the replacements described by CORPORATE_NAME_TRANSLATION and
+    # CORPORATE_NAME_PATTERN to each name
+    s = s.map(standardise_corporate_name_value, na_action="ignore").astype("string[pyarrow]")
     # Strip leading and trailing whitespace
     s = s.str.strip()
     return s
 
 
+def standardise_corporate_name_value(name: str) -> str:
+    """
+    Applies the character deletions and replacements used to standardise
+    corporate names to a single lowercase name, in one pass of the regex.
+    """
+    name = name.translate(CORPORATE_NAME_TRANSLATION)
+    return CORPORATE_NAME_PATTERN.sub(replace_corporate_name_match, name)
+
+
+def replace_corporate_name_match(match: re.Match) -> str:
+    """
+    Returns the replacement for a match of CORPORATE_NAME_PATTERN.
+    """
+    if (abbreviation := match.group("abbreviation")) is not None:
+        return CORPORATE_NAME_ABBREVIATIONS[abbreviation]
+    elif "&" in match.group():
+        return " and "
+    else:
+        return " "
+
+
 def standardise_individual_name(s: pd.Series) -> pd.Series:
     """
     Standardise individual names.
@@ -86,20 +133,59 @@ def standardise_individual_name(s: pd.Series) -> pd.Series:
     Returns:
         The input series with values standardised.
     """
-    # Normalise unicode characters
-    s = s.str.normalize("NFD")
-    # Encode to ASCII and ignore errors:
-    # converts non-ASCII characters to closest ASCII equivilant
-    s = s.str.encode("ascii", errors="ignore")
-    # Convert back to string type
-    s = s.astype("string[pyarrow]")
-    # Lowercase
-    s = s.str.lower()
+    # Convert to lowercase ASCII
+    s = to_lowercase_ascii(s)
     # Strip leading and trailing whitespace
     s = s.str.strip()
     return s
 
 
+def standardise_unique_names(
+    s: pd.Series, standardise_function: typing.Callable[[pd.Series], pd.Series]
+) -> pd.Series:
+    """
+    Standardises names by applying the supplied standardisation function to
+    only the unique names in the Series, then mapping the results back onto
+    every row. Owner names repeat across many titles, so this standardises
+    far fewer values than applying the function to the Series directly.
+
+    Args:
+        s: A Series of names.
+        standardise_function: The function to standardise names with, e.g.
+            `standardise_corporate_name`.
+
+    Returns:
+        The input series with values standardised.
+    """
+    codes, unique_names = pd.factorize(s)
+    standardised_names = standardise_function(pd.Series(unique_names)).array
+    # Rows with a missing name have a code of -1, which is filled with NA
+    return pd.Series(standardised_names.take(codes, allow_fill=True), index=s.index, name=s.name)
+
+
+def to_lowercase_ascii(s: pd.Series) -> pd.Series:
+    """
+    Converts names to lowercase ASCII, using pyarrow compute functions on the
+    underlying Arrow array rather than converting each value in Python.
+
+    Args:
+        s: A Series of names.
+
+    Returns:
+        The input series converted to lowercase ASCII, as a pyarrow backed
+        string Series.
+    """
+    array = pa.array(s, type=pa.string())
+    # Normalise unicode characters
+    array = pc.utf8_normalize(array, "NFD")
+    # Remove non-ASCII characters: after normalising, this removes accents
+    # and other marks, leaving the closest ASCII equivilant
+    array = pc.replace_substring_regex(array, r"[^\x00-\x7f]", "")
+    # Lowercase
+    array = pc.ascii_lower(array)
+    return pd.Series(pd.arrays.ArrowStringArray(array), index=s.index, name=s.name)
+
+
 def build_titles_with_owners(titles_file: Path, owners_file: Path, should_standardise_names: bool) -> gpd.GeoDataFrame:
     """
     Combines the NZ Property Titles spatial dataset from LDS with the
@@ -157,11 +243,18 @@ def build_titles_with_owners(titles_file: Path, owners_file: Path, should_standa
     # Combine individual name parts into a single string, and assign it to a new
     # singular "owner_name" column where present, or the corporate name if not
     logger.info("Building individual owner names")
-    owners_df.fillna({col: "" for col in ["prime_other_names", "prime_surname", "name_suffix"]}, inplace=True)
-    individual_name = owners_df["prime_other_names"] + " " + owners_df["prime_surname"] + " " + owners_df["name_suffix"]
-    individual_name = individual_name.str.strip()
-    individual_name = individual_name.replace(" +", " ", regex=True)
-    individual_name = individual_name.replace("", pa.NA)
+    # Join the name parts with spaces in a single pyarrow compute call,
+    # treating missing parts as empty strings
+    individual_name = pc.binary_join_element_wise(
+        *(pa.array(owners_df[col], type=pa.string()) for col in ["prime_other_names", "prime_surname", "name_suffix"]),
+        " ",
+        null_handling="replace",
+        null_replacement="",
+    )
+    individual_name = pc.utf8_trim_whitespace(individual_name)
+    individual_name = pc.replace_substring_regex(individual_name, " +", " ")
+    individual_name = pc.if_else(pc.equal(individual_name, ""), None, individual_name)
+    individual_name = pd.Series(pd.arrays.ArrowExtensionArray(individual_name), index=owners_df.index)
     owners_df["owner_name"] = np.where(individual_name.isna(), owners_df["corporate_name"], individual_name)
     owners_df["owner_name"] = owners_df["owner_name"].astype("string[pyarrow]")
     if should_standardise_names is True:
@@ -170,22 +263,143 @@ def build_titles_with_owners(titles_file: Path, owners_file: Path, should_standa
         logger.info("Standardising owner names")
         owners_df["standardised_owner_name"] = np.where(
             individual_name.isna(),
-            standardise_corporate_name(owners_df["corporate_name"]),
-            standardise_individual_name(individual_name),
+            standardise_unique_names(owners_df["corporate_name"], standardise_corporate_name),
+            standardise_unique_names(individual_name, standardise_individual_name),
         )
         owners_df["standardised_owner_name"] = owners_df["standardised_owner_name"].astype("string[pyarrow]")
     # Drop unneeded columns
     owners_df.drop(columns=["prime_other_names", "prime_surname", "name_suffix", "corporate_name"], inplace=True)
-    # Merge owners dataset to titles dataset on title_no
+    # Merge owners dataset to titles dataset on title_no, after giving the
+    # title_no columns the same pyarrow string type, so pandas can join them
+    # directly rather than comparing mixed object and Arrow values
     logger.info("Merging owner names to title geometries")
+    titles_gdf["title_no"] = titles_gdf["title_no"].astype(owners_df["title_no"].dtype)
     merged_gdf = titles_gdf.merge(owners_df, on="title_no", how="left")
     return merged_gdf
 
 
-def find_matching_titles(row: pd.Series, use_standardised_names: bool, distance_threshold: int) -> pd.Series:
+def load_titles_with_owners(
+    titles_file: Path, owners_file: Path, should_standardise_names: bool, cache_dir: Path | None = None
+) -> gpd.GeoDataFrame:
+    """
+    Returns the titles with owners built by the `build_titles_with_owners`
+    function, optionally caching them to a parquet file in the supplied cache
+    directory, which is reused on later runs instead of rebuilding them.
+
+    The cache is only reused if the paths, sizes and modification times of
+    the input files match those it was built from, and it contains
+    standardised owner names if they are needed.
+
+    Args:
+        titles_file: Path to the NZ Property Titles GeoPackage exported from LDS.
+        owners_file: Path to the NZ Property Titles Owners List CSV exported from LDS.
+        should_standardise_names: Whether the returned DataFrame should have
+            an additional "standardised_owner_name" column with standardised
+            names.
+        cache_dir: Directory to read titles with owners from, and write them
+            to. If None, titles with owners are not cached.
+
+    Returns:
+        A GeoDataFrame of titles merged with owners.
     """
-    Creates a polygon for a point feature by finding which title geometries the
-    point intersects with, then adding nearby titles owned by the same owners
+    if cache_dir is None:
+        return build_titles_with_owners(titles_file, owners_file, should_standardise_names)
+    input_files = [titles_file, owners_file]
+    cache_file = cache_dir / (
+        f"{titles_file.stem}__{owners_file.stem}__titles_with_owners_v{TITLES_CACHE_VERSION}.parquet"
+    )
+    if is_titles_cache_valid(cache_file, input_files, should_standardise_names):
+        logger.info(f"Loading cached titles with owners from {cache_file}")
+        titles_gdf = read_titles_cache(cache_file)
+        if should_standardise_names is False:
+            titles_gdf = titles_gdf.drop(columns="standardised_owner_name", errors="ignore")
+        return titles_gdf
+    titles_gdf = build_titles_with_owners(titles_file, owners_file, should_standardise_names)
+    logger.info(f"Caching titles with owners to {cache_file}")
+    # Write to a temporary file and move it into place once complete, so an
+    # interrupted write never leaves a partial cache file to be reused
+    temp_file = cache_file.with_suffix(".parquet.tmp")
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        write_titles_cache(titles_gdf, temp_file, input_files)
+        os.replace(temp_file, cache_file)
+    except OSError as error:
+        temp_file.unlink(missing_ok=True)
+        logger.warning(f"Unable to cache titles with owners to {cache_file}: {error}")
+    return titles_gdf
+
+
+def get_titles_cache_inputs(input_files: list[Path]) -> list[dict[str, typing.Any]]:
+    """
+    Returns the resolved path, size and modification time of each of the
+    input files a titles with owners cache is built from, which are stored in
+    the cache file and compared on load to tell if the inputs have changed.
+    """
+    inputs = []
+    for input_file in input_files:
+        stat = input_file.stat()
+        inputs.append({"path": str(input_file.resolve()), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns})
+    return inputs
+
+
+def write_titles_cache(titles_gdf: gpd.GeoDataFrame, cache_file: Path, input_files: list[Path]) -> None:
+    """
+    Writes titles with owners to a parquet cache file, with the geometries
+    encoded as WKB, and the CRS and details of the input files stored in the
+    file's metadata.
+    """
+    table = pa.Table.from_pandas(titles_gdf.to_wkb())
+    cache_metadata = {
+        "version": TITLES_CACHE_VERSION,
+        "crs": titles_gdf.crs.to_wkt() if titles_gdf.crs is not None else None,
+        "inputs": get_titles_cache_inputs(input_files),
+    }
+    table = table.replace_schema_metadata(
+        {**table.schema.metadata, TITLES_CACHE_METADATA_KEY: json.dumps(cache_metadata)}
+    )
+    pq.write_table(table, cache_file)
+
+
+def read_titles_cache(cache_file: Path) -> gpd.GeoDataFrame:
+    """
+    Reads titles with owners from a parquet cache file written by the
+    `write_titles_cache` function.
+    """
+    table = pq.read_table(cache_file)
+    cache_metadata = json.loads(table.schema.metadata[TITLES_CACHE_METADATA_KEY])
+    titles_df = table.to_pandas()
+    geometry = gpd.GeoSeries.from_wkb(titles_df["geometry"], index=titles_df.index, crs=cache_metadata["crs"])
+    return gpd.GeoDataFrame(titles_df, geometry=geometry)
+
+
+def is_titles_cache_valid(cache_file: Path, input_files: list[Path], should_standardise_names: bool) -> bool:
+    """
+    Checks whether a cache file written by `write_titles_cache` exists, is a
+    readable parquet file, was built from input files with the same paths,
+    sizes and modification times as the supplied input files, and contains
+    standardised owner names if they are needed.
+    """
+    if not cache_file.exists():
+        return False
+    try:
+        schema = pq.read_schema(cache_file)
+        cache_metadata = json.loads((schema.metadata or {})[TITLES_CACHE_METADATA_KEY])
+    except (OSError, KeyError, ValueError, pa.ArrowInvalid) as error:
+        logger.warning(f"Ignoring unreadable titles with owners cache {cache_file}: {error}")
+        return False
+    if cache_metadata.get("version") != TITLES_CACHE_VERSION:
+        return False
+    if cache_metadata.get("inputs") != get_titles_cache_inputs(input_files):
+        return False
+    if should_standardise_names is True:
+        return "standardised_owner_name" in schema.names
+    return True
+
+
+def find_matching_titles(title_positions: np.ndarray, distance_threshold: int) -> pd.Series:
+    """
+    Creates a polygon for a point feature from the title geometries the point
+    intersects with, then adding nearby titles owned by the same owners
     incrementally.
 
     We initially find all polygons the input point intersects with, and create
@@ -200,22 +414,22 @@ def find_matching_titles(row: pd.Series, use_standardised_names: bool, distance_
     owners to our owners set over time: we only use the owners from the initial
     intersecting titles for each round of incrementally adding nearby titles.
 
-    If the input geometry is null, or there are no intersecting titles,
-    we return None.
+    If there are no intersecting titles (which includes when the input
+    geometry is null), we return None.
 
-    This function is intended to be passed to the `apply` method of a DataFrame,
-    rather than called directly.
+    This function is intended to be passed to the `apply` method of a Series
+    of intersecting title positions for each point, as built by the function
+    `find_points_in_titles_with_owners`, rather than called directly.
 
     Before applying this function, the titles GeoDataFrame (as created by the
     `build_titles_with_owners` function) must be assigned to the TITLES_GDF
-    global variable, which is done by the function
+    global variable, and the arrays and indexes derived from it to the other
+    global variables, which is done by the function
     `find_points_in_titles_with_owner`.
 
     Args:
-        row: A row of a GeoDataFrame containing Point geometries.
-        use_standardised_names: If True, the combining of nearby owners will
-            use values from the "standardised_owner_name" column of TITLES_GDF,
-            otherwise it will use the "owner_name" column.
+        title_positions: The integer positions in TITLES_GDF of the titles
+            which the point intersects with.
         distance_threshold: how far away nearby titles can be from the starting
             title before they are no longer combined, in metres. I.e. a value
             of 10 will combine all titles with the same owners within 10m.
@@ -226,72 +440,104 @@ def find_matching_titles(row: pd.Series, use_standardised_names: bool, distance_
 
     Returns:
         A Pandas Series with 3 values (which, if this function is called as
-        intended via df.apply(), will become a DataFrame with 3 columns for all
+        intended via Series.apply(), will become a DataFrame with 3 columns for all
         results together). The first column is the polygon geometry we have
         found, the second is a string value of all the owner names joined with
         commas, and the third is a count of the number of owner names. If the
-        input geometry is null, or the input geometry does not intersect with
-        any titles, we return None for the first geometry column and pd.NA for
-        the second and third columns.
+        point does not intersect with any titles, we return None for the first
+        geometry column and pd.NA for the second and third columns.
     """
     # Raise an exception if the titles file hasn't been loaded
     if TITLES_GDF is None:
         raise ValueError("Global TITLES_GDF has not been set")
-    if use_standardised_names is True:
-        owner_column = "standardised_owner_name"
-    else:
-        owner_column = "owner_name"
-    none_return_value = pd.Series([None, pd.NA, pd.NA])
-    # Return early for null geometries
-    if row.geometry is None:
-        return none_return_value
-    # Query the spatial index to find titles whose bounding boxes intersect the point
-    rough_matching_titles = TITLES_GDF.loc[TITLES_GDF.sindex.query(row.geometry)]
-    # Return early if there were no matches
-    if len(rough_matching_titles) == 0:
-        return none_return_value
-    # Refine the rough matches to actual geometry intersections
-    matching_titles = rough_matching_titles[rough_matching_titles.intersects(row.geometry)]
-    # Return early if there were no matches
-    if len(matching_titles) == 0:
-        return none_return_value
-    # Build a set of all unique owners for all the matched titles
-    all_owners = set(matching_titles[owner_column])
-    # Remove None and NA from set if present
-    try:
-        all_owners.remove(pd.NA)
-    except KeyError:
-        pass
-    # Union all matching titles together
-    geom = shapely.union_all(matching_titles.geometry)
+    # Return early if the point doesn't intersect any titles
+    if len(title_positions) == 0:
+        return pd.Series([None, pd.NA, pd.NA])
+    # Find the unique owner codes for all the matched titles
+    owner_codes = np.unique(TITLE_OWNER_CODES[title_positions])
+    # Remove the code for titles without an owner, if present
+    owner_codes = owner_codes[owner_codes >= 0]
+    # Collect the positions of titles to union together into our geom,
+    # starting with the matching titles. These are only unioned once, after
+    # the loop.
+    merged_positions = [title_positions]
+    # Track the titles added in the last round: any titles within the
+    # distance threshold of earlier titles have already been found
+    new_positions = title_positions
     # Track how many times we've looped
     rounds = 1
     # Track which titles we've merged into our geom
-    merged_ids = set()
-    # Find titles with the same owner as those we unioned together
-    titles_with_same_owner = TITLES_GDF[
-        TITLES_GDF[owner_column].isin(all_owners) & ~TITLES_GDF["id"].isin(matching_titles["id"])
-    ]
+    merged_ids = np.empty(0, dtype=TITLE_IDS.dtype)
+    # Find the positions of titles with the same owner as those we unioned
+    # together, excluding the titles we unioned
+    same_owner_positions = np.concatenate(
+        [np.empty(0, dtype=np.intp), *(TITLE_POSITIONS_BY_OWNER[owner_code] for owner_code in owner_codes)]
+    )
+    same_owner_positions = same_owner_positions[~np.isin(TITLE_IDS[same_owner_positions], TITLE_IDS[title_positions])]
     # Start loop
     while True:
-        # Find all titles with the same owner, within the distance threshold,
-        # which we haven't already merged into our geom
-        nearby_titles_with_same_owner = titles_with_same_owner[
-            ~titles_with_same_owner["id"].isin(merged_ids)
-            & (titles_with_same_owner.geometry.distance(geom) <= distance_threshold)
-        ]
-        # Update the set of titles we have merged
-        merged_ids.update(nearby_titles_with_same_owner["id"])
+        # Find titles within the distance threshold of the titles added last
+        # round, then keep those with the same owner
+        nearby_positions = find_title_neighbours(new_positions, distance_threshold)
+        nearby_positions = np.intersect1d(nearby_positions, same_owner_positions)
+        # Exclude titles we have already merged into our geom
+        nearby_positions = nearby_positions[~np.isin(TITLE_IDS[nearby_positions], merged_ids)]
+        # Update the titles we have merged
+        merged_ids = np.concatenate([merged_ids, TITLE_IDS[nearby_positions]])
         # Break out of the loop if there are no nearby titles with the same
         # owner we haven't already merged, or we'vew reached the maximum number
         # of rounds through the loop
-        if len(nearby_titles_with_same_owner) == 0 or rounds >= TITLE_MERGE_MAX_ROUNDS:
+        if len(nearby_positions) == 0 or rounds >= TITLE_MERGE_MAX_ROUNDS:
             break
-        # Merge any nearby titles with the same owner into our geom
-        geom = shapely.union_all([geom, *nearby_titles_with_same_owner.geometry])
+        # Add any nearby titles with the same owner to our geom
+        new_positions = nearby_positions
+        merged_positions.append(new_positions)
         rounds += 1
+    # Union all the titles we've merged together into our geom. Titles with
+    # several owners have a row for each owner, so take each title only once.
+    merged_positions = np.concatenate(merged_positions)
+    _, unique_indices = np.unique(TITLE_IDS[merged_positions], return_index=True)
+    merged_geoms = TITLE_GEOMS[merged_positions[unique_indices]]
+    # Skip the union if there is only a single title
+    if len(merged_geoms) == 1:
+        geom = merged_geoms[0]
+    else:
+        geom = shapely.union_all(merged_geoms)
     # Return the geom
-    return pd.Series([geom, ", ".join(sorted(all_owners)), len(all_owners)])
+    all_owners = sorted(OWNER_NAMES[owner_codes])
+    return pd.Series([geom, ", ".join(all_owners), len(all_owners)])
+
+
+def find_title_neighbours(positions: np.ndarray, distance_threshold: int) -> np.ndarray:
+    """
+    Finds the titles within the distance threshold of any of the supplied
+    titles, measuring distances between the simplified title geometries.
+
+    Neighbours of titles which are not yet in the TITLE_NEIGHBOURS cache are
+    found with a single bulk query of the titles spatial index, then cached,
+    so titles reached while growing the polygons of several input points (for
+    example, points on the same property) are only queried once.
+
+    Args:
+        positions: The integer positions in TITLES_GDF of the titles to find
+            the neighbours of.
+        distance_threshold: The distance in metres within which titles are
+            neighbours.
+
+    Returns:
+        The positions in TITLES_GDF of the neighbouring titles, which may
+        contain duplicates.
+    """
+    positions = positions.tolist()
+    uncached_positions = [position for position in positions if position not in TITLE_NEIGHBOURS]
+    if uncached_positions:
+        # Returns pairs of title and neighbour positions, sorted by title
+        input_positions, neighbour_positions = TITLES_SIMPLIFIED_TREE.query(
+            TITLE_SIMPLIFIED_GEOMS[uncached_positions], predicate="dwithin", distance=distance_threshold
+        )
+        split_indices = np.searchsorted(input_positions, np.arange(1, len(uncached_positions)))
+        TITLE_NEIGHBOURS.update(zip(uncached_positions, np.split(neighbour_positions, split_indices)))
+    return np.concatenate([np.empty(0, dtype=np.intp), *(TITLE_NEIGHBOURS[position] for position in positions)])
 
 
 def find_points_in_titles_with_owners(
@@ -301,6 +547,10 @@ def find_points_in_titles_with_owners(
     Replaces the geometry of the supplied GeoDataFrame with a polygon created by
     the `find_matching_titles` function.
 
+    The titles intersecting every input point are found up front with a single
+    bulk query of the titles spatial index, and then passed to
+    `find_matching_titles` for each point.
+
     Args:
         input_gdf: GeoDataFrame with point geometries.
         titles_file: Path to the Titles with Owners file.
@@ -314,13 +564,48 @@ def find_points_in_titles_with_owners(
     Returns:
         The supplied GeoDataFrame with its geometry updated.
     """
-    global TITLES_GDF
-    TITLES_GDF = titles_gdf
-    TITLES_GDF.sindex
-    pandarallel.initialize(progress_bar=True, verbose=0)
+    global TITLES_GDF, TITLE_IDS, TITLE_GEOMS, TITLES_TREE, TITLE_SIMPLIFIED_GEOMS, TITLES_SIMPLIFIED_TREE
+    global TITLE_OWNER_CODES, OWNER_NAMES, TITLE_POSITIONS_BY_OWNER, TITLE_NEIGHBOURS
+    # There are no points to find polygons for, so just add the output columns
+    if input_gdf.empty:
+        return input_gdf.assign(owner_names=pd.Series(dtype=object), owner_count=pd.Series(dtype=int))
+    if use_standardised_names is True:
+        owner_column = "standardised_owner_name"
+    else:
+        owner_column = "owner_name"
+    # Only keep the columns used to find matching titles
+    TITLES_GDF = titles_gdf[["id", owner_column, "geometry"]]
+    # Keep the ids and geometries as numpy arrays, and build a spatial index
+    # over the geometries, so finding matching titles for each point only
+    # needs numpy indexing rather than DataFrame lookups
+    TITLE_IDS = TITLES_GDF["id"].to_numpy()
+    TITLE_GEOMS = TITLES_GDF.geometry.to_numpy()
+    TITLES_TREE = shapely.STRtree(TITLE_GEOMS)
+    # Titles can have thousands of vertices, so find nearby titles using
+    # simplified geometries, which makes each distance check much cheaper
+    TITLE_SIMPLIFIED_GEOMS = shapely.simplify(TITLE_GEOMS, TITLE_SIMPLIFY_TOLERANCE, preserve_topology=True)
+    TITLES_SIMPLIFIED_TREE = shapely.STRtree(TITLE_SIMPLIFIED_GEOMS)
+    # Encode owner names as integers, so owners are compared and looked up
+    # as integers rather than by hashing strings
+    TITLE_OWNER_CODES, OWNER_NAMES = pd.factorize(TITLES_GDF[owner_column])
+    # Index the positions of each owner's titles once, rather than scanning
+    # all titles for the owners of each input point
+    TITLE_POSITIONS_BY_OWNER = TITLES_GDF.groupby(TITLE_OWNER_CODES).indices
+    # Start with an empty cache of neighbouring titles for this distance threshold
+    TITLE_NEIGHBOURS = {}
+    logger.info("Finding titles intersecting each input point")
+    # Returns pairs of input point and title positions, sorted by input point
+    input_positions, title_positions = TITLES_TREE.query(input_gdf.geometry.to_numpy(), predicate="intersects")
+    # Split the title positions into one array per input point
+    split_indices = np.searchsorted(input_positions, np.arange(1, len(input_gdf)))
+    title_positions_by_point = pd.Series(np.split(title_positions, split_indices), index=input_gdf.index)
+    # Run in a single process: with the intersecting titles found up front,
+    # each point only needs a few index queries, which costs less than
+    # copying the titles to worker processes
+    tqdm.pandas(unit="points")
     logger.info("Finding polygon for each input point")
-    matching_titles_df = input_gdf.parallel_apply(
-        find_matching_titles, axis=1, use_standardised_names=use_standardised_names, distance_threshold=distance_threshold
+    matching_titles_df = title_positions_by_point.progress_apply(
+        find_matching_titles, distance_threshold=distance_threshold
     )
     input_gdf["geometry"] = gpd.GeoSeries(matching_titles_df[0])
     input_gdf["owner_names"] = matching_titles_df[1]
@@ -3,10 +3,11 @@ import typing
 from dataclasses import dataclass
 from pathlib import Path
 
+import numpy as np
 import pyproj
 import requests
-from shapely.geometry import MultiPoint, Point
-from shapely.ops import nearest_points, transform
+import shapely
+from shapely.geometry import Point
 from tqdm import tqdm
 
 from facilities_change_detection.core.facilities import ChangeAction, ExternalSource, GeoInterface, GeoSchema
@@ -39,7 +40,7 @@ class FatalError(Exception):
     pass
 
 
-@dataclass(eq=False)
+@dataclass(eq=False, slots=True)
 class MOESchool(ExternalSource):
     """
     A school facility from MOE data.
@@ -68,11 +69,13 @@ class MOESchool(ExternalSource):
     suburb: str | None = None
     city: str | None = None
     roll_date: str | None = None
-    latitude: str | None = None
-    longitude: str | None = None
+    latitude: float | None = None
+    longitude: float | None = None
 
     @classmethod
-    def from_api_response(cls, record) -> typing.Self:
+    def from_api_response(
+        cls, record, geom: Point | None, latitude: float | None, longitude: float | None
+    ) -> typing.Self:
         return cls(
             source_id=record["School_Id"],
             source_name=record["Org_Name"],
@@ -82,22 +85,27 @@ class MOESchool(ExternalSource):
             city=record["Add1_City"],
             roll_date=record["Roll_Date"],
             occupancy=record["Total"],
-            latitude=record["Latitude"],
-            longitude=record["Longitude"],
-            geom=cls._make_geom(record["Latitude"], record["Longitude"]),
+            latitude=latitude,
+            longitude=longitude,
+            geom=geom,
         )
 
     @staticmethod
-    def _make_geom(lat: float | None, lon: float | None) -> Point | None:
+    def _make_geoms(lons: np.ndarray, lats: np.ndarray) -> list[Point | None]:
         """
-        Creates a Point geometry from the latitude and longitude properties from the
-        MOE API response. The geographic coordinates are converted to NZTM.
-        If either of the values is None - which can be the case, as not all schools
-        in the MOE API have coordinates - then None is returned instead.
+        Creates Point geometries from arrays of the longitudes and latitudes of
+        records from the MOE API response. The geographic coordinates of all the
+        records are converted to NZTM in a single call to the transformer.
+        If either of the values of a record is NaN - which can be the case, as
+        not all schools in the MOE API have coordinates - then None is returned
+        for that record instead.
         """
-        if lat is None or lon is None:
-            return None
-        return transform(TRANSFORMER_4326_TO_2193.transform, Point(lon, lat))
+        xs, ys = TRANSFORMER_4326_TO_2193.transform(lons, lats)
+        # Create all the points in a single call, then remove those which
+        # were missing a coordinate
+        geoms = shapely.points(xs, ys)
+        geoms[np.isnan(lons) | np.isnan(lats)] = None
+        return geoms.tolist()
 
     @property
     def __geo_interface__(self) -> GeoInterface:
@@ -145,12 +153,19 @@ def request_moe_api(
 
     moe_schools = {}
 
-    for record in tqdm(
-        response_content["result"]["records"],
-        total=len(response_content["result"]["records"]),
-        unit="schools",
+    records = response_content["result"]["records"]
+    # Parse the coordinates of all records to floats up front, as the API can
+    # return them as strings, with missing coordinates as NaN
+    lons = np.array([record["Longitude"] for record in records], dtype=np.float64)
+    lats = np.array([record["Latitude"] for record in records], dtype=np.float64)
+    geoms = MOESchool._make_geoms(lons, lats)
+    coords = zip(np.where(np.isnan(lats), None, lats).tolist(), np.where(np.isnan(lons), None, lons).tolist())
+    # Building each school is quick, so only refresh the progress bar a few
+    # times a second rather than checking the time on most iterations
+    for record, geom, (lat, lon) in tqdm(
+        zip(records, geoms, coords), total=len(records), unit="schools", mininterval=0.5, miniters=100
     ):
-        moe_school = MOESchool.from_api_response(record)
+        moe_school = MOESchool.from_api_response(record, geom, latitude=lat, longitude=lon)
         moe_schools[moe_school.source_id] = moe_school
     return moe_schools
 
@@ -171,18 +186,34 @@ def filter_moe_schools(
     Returns: collection of MOE Schools minus those which have been excluded.
     """
 
-    for id_, school in moe_schools.items():
-        # Ignore proposed schools
+    # Ignore proposed schools
+    for school in moe_schools.values():
         if "proposed" in school.source_name.lower():
             school.change_action = ChangeAction.IGNORE
-        if school.source_type == "Teen Parent Unit" and school.geom is not None:
-            # Create a multipoint containing all other schools
-            other_schools = MultiPoint(
-                [school.geom for school in moe_schools.values() if school.source_id != id_ and school.geom is not None]
-            )
-            # Get point of nearest other school
-            nearest_other_school = nearest_points(school.geom, other_schools)[1]
-            # Ignore if the nearest other school point is less than the threshold distance
-            if school.geom.distance(nearest_other_school) < TEEN_UNIT_DISTANCE_THRESHOLD:
-                school.change_action = ChangeAction.IGNORE
+
+    # Find the Teen Parent Units which still need checking
+    teen_units = [
+        school
+        for school in moe_schools.values()
+        if school.source_type == "Teen Parent Unit"
+        and school.geom is not None
+        and school.change_action != ChangeAction.IGNORE
+    ]
+    if not teen_units:
+        return moe_schools
+    # Build a spatial index of all school points once, and query it for the
+    # schools within the threshold distance of every unit in a single call
+    schools_with_geoms = [school for school in moe_schools.values() if school.geom is not None]
+    schools_tree = shapely.STRtree([school.geom for school in schools_with_geoms])
+    unit_indices, school_indices = schools_tree.query(
+        [school.geom for school in teen_units], predicate="dwithin", distance=TEEN_UNIT_DISTANCE_THRESHOLD
+    )
+    # Ignore units where any other school point is less than the threshold distance
+    distances = shapely.distance(
+        [teen_units[index].geom for index in unit_indices], [schools_with_geoms[index].geom for index in school_indices]
+    )
+    for unit_index, school_index, distance in zip(unit_indices.tolist(), school_indices.tolist(), distances.tolist()):
+        unit = teen_units[unit_index]
+        if schools_with_geoms[school_index].source_id != unit.source_id and distance < TEEN_UNIT_DISTANCE_THRESHOLD:
+            unit.change_action = ChangeAction.IGNORE
     return moe_schools
@@ -1,12 +1,31 @@
+import functools
 import re
 import unicodedata
 from typing import Any, overload
 
 import geopandas as gpd
+import numpy as np
 import pandas as pd
-from pandas.api.types import is_bool_dtype, is_numeric_dtype, is_object_dtype
-
-
+from pandas.api.types import (
+    infer_dtype,
+    is_bool_dtype,
+    is_float_dtype,
+    is_integer_dtype,
+    is_object_dtype,
+)
+
+# Position between a lowercase and an uppercase letter in a CamelCase name
+CAMEL_CASE_BOUNDARY_PATTERN = re.compile(r"(?<=[a-z])(?=[A-Z])")
+# Replaces any (ascii) whitespace characters or forward slash with an
+# underscore, and removes any brackets
+COLUMN_NAME_TRANSLATION = str.maketrans(
+    {**dict.fromkeys(" \t\n\r\x0b\x0c\x1c\x1d\x1e\x1f/", "_"), "(": None, ")": None}
+)
+
+
+# Column names repeat across the files and DataFrames processed in a run,
+# so cache the standardised form of each name
+@functools.cache
 def standardise_column_name(name: str):
     """
     Standardises a supplied name to use column name.
@@ -21,25 +40,19 @@ def standardise_column_name(name: str):
     Returns:
         The name, standardised according to the above procedure.
     """
-    new_name = ""
-    # Normalise to Unicode Canonical Decomposition
-    name = unicodedata.normalize("NFD", name)
-    # Round trip encode to ascii and back to utf-8
-    name = name.encode("ascii", "ignore").decode("utf-8")
+    # Names which are already ascii (most of them) are unchanged by the
+    # following two steps, so skip them
+    if not name.isascii():
+        # Normalise to Unicode Canonical Decomposition
+        name = unicodedata.normalize("NFD", name)
+        # Round trip encode to ascii and back
+        name = name.encode("ascii", "ignore").decode("ascii")
     # Add space in between CamelCase words
-    for n, char in enumerate(name):
-        if n != 0:
-            prev_char = name[n - 1]
-            if char.isupper() and prev_char.islower():
-                new_name += " "
-        new_name += char
+    name = CAMEL_CASE_BOUNDARY_PATTERN.sub(" ", name)
     # Strip leading and trailing whitespace and convert to lowercase
-    new_name = new_name.strip().lower()
-    # Replace any whitespace characters or forward slash with an underscore
-    new_name = re.sub(r"[\s/]", "_", new_name)
-    # Remove any brackets
-    new_name = re.sub(r"[\(\)]", "", new_name)
-    return new_name
+    name = name.strip().lower()
+    # Replace whitespace and forward slashes, and remove brackets
+    return name.translate(COLUMN_NAME_TRANSLATION)
 
 
 def filter_df_columns(df: pd.DataFrame, columns: dict[str, str]) -> pd.DataFrame:
@@ -62,11 +75,22 @@ def filter_df_columns(df: pd.DataFrame, columns: dict[str, str]) -> pd.DataFrame
     Returns:
         A DataFrame containing only the desired columns.
     """
-    df.columns = [standardise_column_name(col) for col in df.columns]
-    missing_cols = columns.keys() - set(df.columns)
-    if missing_cols:
-        raise ValueError(f"Missing columns {missing_cols}")
-    df = df[columns.keys()]
+    # If the column names are already standardised, there's no need to
+    # standardise them again
+    if columns.keys() <= set(df.columns):
+        selected_cols = list(columns)
+    else:
+        # Map the standardised names back to the original column names, so
+        # the desired columns can be selected without replacing the column
+        # names of the whole DataFrame
+        standardised_cols = {standardise_column_name(col): col for col in df.columns}
+        missing_cols = columns.keys() - standardised_cols.keys()
+        if missing_cols:
+            raise ValueError(f"Missing columns {missing_cols}")
+        selected_cols = [standardised_cols[col] for col in columns]
+    # Selecting the columns returns a new DataFrame, so rename its columns in
+    # place rather than with `rename`, which would copy the data again
+    df = df[selected_cols]
     df.columns = list(columns.values())
     return df
 
@@ -81,11 +105,35 @@ def strip_column_values(df: pd.DataFrame, cols: list[str]) -> pd.DataFrame:
         cols: The columns to perform the operation on.
 
     Returns:
-        The supplied DataFrame with leading and trailing whitespace removed from
-        the specified columns.
+        A copy of the supplied DataFrame with leading and trailing whitespace
+        removed from the specified columns.
     """
-    df[cols] = df[cols].apply(lambda col: col.str.strip())
-    return df
+    return df.assign(**{col: strip_values(df[col]) for col in cols})
+
+
+def strip_values(s: pd.Series) -> pd.Series:
+    """
+    Removes leading and trailing whitespace from the values of a Series.
+
+    Columns such as facility types repeat a small number of values many times,
+    so if there are few unique values, only those are stripped and the results
+    are mapped back onto every row.
+
+    Args:
+        s: A Series of strings.
+
+    Returns:
+        The Series with leading and trailing whitespace removed from its values.
+    """
+    codes, unique_values = pd.factorize(s)
+    # Only strip the unique values if they are less than a quarter of all the
+    # values, otherwise it isn't worth the extra step of mapping them back
+    if len(unique_values) * 4 >= len(s):
+        return s.str.strip()
+    stripped_values = pd.Series(unique_values).str.strip().array
+    stripped = pd.Series(stripped_values.take(codes, allow_fill=True), index=s.index, name=s.name)
+    # Rows with a missing value have a code of -1, so restore their original value
+    return stripped.where(s.notna(), s)
 
 
 def df_to_dict(df: pd.DataFrame | gpd.GeoDataFrame, key_column: str) -> dict[str, dict[str, Any]]:
@@ -126,14 +174,7 @@ def df_to_dict(df: pd.DataFrame | gpd.GeoDataFrame, key_column: str) -> dict[str
     """
     if not df[key_column].is_unique:
         raise ValueError(f"Cannot convert DataFrame to a dict, column {key_column} contains duplicated values")
-    d = {}
-    for row in df.itertuples():
-        key = getattr(row, key_column)
-        row_dict = row._asdict()
-        del row_dict["Index"]
-        del row_dict[key_column]
-        d[key] = row_dict
-    return d
+    return dict(zip(df[key_column].tolist(), df.drop(columns=key_column).to_dict(orient="records")))
 
 
 def dict_to_df(d: dict[str, dict[str, Any]], key_column: str) -> pd.DataFrame:
@@ -148,7 +189,7 @@ def dict_to_df(d: dict[str, dict[str, Any]], key_column: str) -> pd.DataFrame:
     Returns:
         A DataFrame derived from the supplied Dictionary.
     """
-    df = pd.DataFrame([{key_column: k, **v} for k, v in d.items()])
+    df = pd.DataFrame.from_dict(d, orient="index").rename_axis(key_column).reset_index()
     df = convert_intlike_cols_to_nullable_int(df)
     return df
 
@@ -185,9 +226,10 @@ def convert_intlike_cols_to_nullable_int(df):
         The DataFrame with any "int-like" columns converted to nullable integer
         data type.
     """
-    for col in df.columns:
-        if is_col_intlike(df[col]):
-            df[col] = df[col].astype("Int64")
+    intlike_cols = [col for col in df.columns if is_col_intlike(df[col])]
+    # Convert all the columns in a single call, rather than one at a time
+    if intlike_cols:
+        df = df.astype(dict.fromkeys(intlike_cols, "Int64"))
     return df
 
 
@@ -201,6 +243,9 @@ def is_col_intlike(s: pd.Series) -> bool:
     - all values are either null, or are numbers which when converted to a
       float, are valid integers. I.e. are themselves an int, or are a float
       with no decimal portion.
+    - at least one value is not null (unless it is already of an integer
+      dtype), as a column of only nulls gives no indication of what type it
+      should be.
 
     Args:
         s: The Series to check
@@ -211,20 +256,29 @@ def is_col_intlike(s: pd.Series) -> bool:
     # Reject boolean dtype
     if is_bool_dtype(s):
         return False
-    # Reject dtypes which is neither numeric nor object
-    if not is_numeric_dtype(s) or not is_object_dtype(s):
+    # Integer dtypes (including nullable integers) are always int-like
+    if is_integer_dtype(s):
+        return True
+    # Float dtypes can be checked directly, without finding unique values
+    if is_float_dtype(s):
+        floats = s.dropna().to_numpy(dtype=np.float64)
+    # Reject dtypes which are neither numeric nor object
+    elif not is_object_dtype(s):
         return False
-    # Iterate through each value
-    for val in s.unique():
-        # Skip null values
-        if pd.isna(val):
-            continue
-        # Reject if any value is non-numeric
-        if not is_numeric_dtype(val):
-            return False
-        # Reject if any value when converted to a float is not an integer
-        # (i.e. has a decimal portion)
-        if not float(val).is_integer():
+    else:
+        # Infer the type of the non-null values in a single pass
+        inferred_type = infer_dtype(s, skipna=True)
+        # Accept if all values are integers
+        if inferred_type == "integer":
+            return True
+        # Reject if any value is non-numeric (including booleans, which are
+        # considered numeric), or if there are no values
+        if inferred_type not in ("floating", "mixed-integer-float"):
             return False
-    # If we haven't rejected anything yet, return True
-    return True
+        floats = s.dropna().to_numpy(dtype=np.float64)
+    # Reject if there are no values
+    if floats.size == 0:
+        return False
+    # Reject if any value when converted to a float is not an integer
+    # (i.e. is infinite or has a decimal portion)
+    return bool(np.isfinite(floats).all() and (floats == np.trunc(floats)).all())